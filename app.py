@@ -1,27 +1,99 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from itertools import chain, combinations, islice, repeat
+from multiprocessing import get_context, shared_memory
+import functools
+import json
+import os
+import threading
+from sgp4.api import SGP4_ERRORS, Satrec, SatrecArray, jday
 from skyfield.api import EarthSatellite, load, wgs84
 import math
 
+try:
+    from numba import njit, prange, set_num_threads
+except ImportError:  # Numba is optional; fall back to numexpr or NumPy
+    njit = None
+
+try:
+    import numexpr
+except ImportError:  # numexpr is optional; opt-in via the ISL_FILTER_BACKEND environment variable
+    numexpr = None
+
 app = Flask(__name__)
 CORS(app)
 
 # Load Skyfield timescale once
 _ts = load.timescale()
 
+# Per-thread scratch buffers reused across requests (see _buf)
+_tls = threading.local()
+
+# Serializes calls into the parallel Numba kernel: Numba's fallback "workqueue" threading
+# layer aborts the process if two request threads launch parallel regions at once
+_numba_lock = threading.Lock()
+
+# Worker processes for all-pairs interlink analysis, created on first use
+_pair_pool = None
+_pair_pool_lock = threading.Lock()
+
 EARTH_RADIUS_KM = 6378.137  # WGS84 equatorial radius
 DEFAULT_COMM_RANGE_KM = 1000.0
 DEFAULT_TIME_STEP_SEC = 300
+WINDOW_CHUNK_STEPS = 10_000  # timesteps propagated per block when yielding windows
+# All-pairs work below this many pair-timesteps runs inline rather than in the process pool
+PARALLEL_MIN_PAIR_STEPS = 1_000_000
+MAX_MANY_SATELLITES = 100  # per all-pairs request, i.e. at most 4950 pairs
+FILTER_DTYPE = np.float32  # precision of the obstruction + range filter kernel
+# numexpr only pays off with several cores (slower than NumPy single-threaded), so it is
+# opt-in: set ISL_FILTER_BACKEND=numexpr to prefer it over Numba and NumPy
+USE_NUMEXPR = os.environ.get('ISL_FILTER_BACKEND', '').strip().lower() == 'numexpr'
+REFINE_TOLERANCE_SEC = 1.0e-3  # bisection tolerance for interval entry/exit times
+STREAM_CHUNK_SIZE = 64 * 1024  # characters per streamed response chunk
+# Largest scratch array kept per thread: (2, N, 3) float64 positions for N = 1e6 steps
+BUFFER_POOL_MAX_ELEMENTS = 6_000_000
+
+# WGS84 ellipsoid, used for the closed-form ECEF -> geodetic conversion
+WGS84_FLATTENING = 1.0 / 298.257223563
+WGS84_E2 = WGS84_FLATTENING * (2.0 - WGS84_FLATTENING)
+
+
+@functools.lru_cache(maxsize=4096)
+def _build_satrec(tle_line1: str, tle_line2: str) -> Satrec:
+    """Parse a TLE and run SGP4 initialization once per distinct (line1, line2).
+
+    The cached ``Satrec`` keeps its deep-space coefficients, so GEO/Molniya orbits pay
+    ``sgp4init`` once per process and ``SatrecArray`` only copies the initialized record.
+    """
+    return Satrec.twoline2rv(tle_line1, tle_line2)
 
 
 class Satellite:
+    """Thin adapter around a cached ``Satrec``; the Skyfield wrapper is built on demand."""
+
     def __init__(self, name: str, tle_line1: str, tle_line2: str):
         self.name = name
         self.tle_line1 = tle_line1.strip()
         self.tle_line2 = tle_line2.strip()
-        self._sat = EarthSatellite(self.tle_line1, self.tle_line2, self.name)
+        self.model = _build_satrec(self.tle_line1, self.tle_line2)
+
+    @functools.cached_property
+    def _sat(self) -> EarthSatellite:
+        sat = EarthSatellite.from_satrec(self.model, _ts)
+        sat.name = self.name
+        return sat
+
+    def positions_at(self, t):
+        """Propagate the satellite to a (possibly vectorized) Skyfield Time.
+
+        Returns the Skyfield Geocentric position; ``position.km`` has shape (3,) or (3, N).
+        """
+        return self._sat.at(t)
 
     def get_position(self, dt: datetime):
         """Get satellite geodetic position and ECI vector at a specific UTC datetime.
@@ -31,17 +103,17 @@ class Satellite:
         if dt.tzinfo is None:
             dt = dt.replace(tzinfo=timezone.utc)
         t = _ts.utc(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
-        geocentric = self._sat.at(t)
+        geocentric = self.positions_at(t)
 
         # ECI position vector in km
         position_km = geocentric.position.km
         eci_vec = [float(position_km[0]), float(position_km[1]), float(position_km[2])]
 
-        # Geodetic subpoint
-        sp = wgs84.subpoint_of(geocentric)
-        lat = float(sp.latitude.degrees)
-        lon = float(sp.longitude.degrees)
-        alt_km = float(sp.elevation.km)
+        # Geodetic position; altitude is the height above the WGS84 ellipsoid, as in window rows
+        gp = wgs84.geographic_position_of(geocentric)
+        lat = float(gp.latitude.degrees)
+        lon = float(gp.longitude.degrees)
+        alt_km = float(gp.elevation.km)
 
         return {
             'lat': lat,
@@ -51,66 +123,727 @@ class Satellite:
         }
 
 
+def _buf(name: str, shape, dtype):
+    """Thread-local scratch array of ``shape``/``dtype``, reused across requests.
+
+    Each name is backed by a flat buffer that only grows, so repeated requests skip the
+    allocation. Arrays larger than ``BUFFER_POOL_MAX_ELEMENTS`` are allocated fresh and not
+    kept. Contents are overwritten by the next call with the same name on this thread.
+    """
+    dtype = np.dtype(dtype)
+    size = math.prod(shape)
+    if size > BUFFER_POOL_MAX_ELEMENTS:
+        return np.empty(shape, dtype)
+    pool = getattr(_tls, 'buffers', None)
+    if pool is None:
+        pool = _tls.buffers = {}
+    buffer = pool.get(name)
+    if buffer is None or buffer.size < size or buffer.dtype != dtype:
+        buffer = pool[name] = np.empty(size, dtype)
+    return buffer[:size].reshape(shape)
+
+
+def build_time_grid(start_date: datetime, n_steps: int, time_step: int, first_step: int = 0):
+    """Build ``n_steps`` samples spaced ``time_step`` seconds apart as SGP4 Julian dates.
+
+    Sampling starts at step ``first_step`` of the grid anchored at ``start_date``.
+    Returns ``(jd, fr, offsets)``: whole and fractional UTC Julian dates suitable for
+    ``SatrecArray.sgp4`` and the sample times in seconds from ``start_date``. ``jd`` and
+    ``fr`` live in the thread-local buffer pool.
+    """
+    offsets = np.arange(first_step, first_step + n_steps) * time_step
+    jd0, fr0 = jday(start_date.year, start_date.month, start_date.day,
+                    start_date.hour, start_date.minute, start_date.second)
+    jd = _buf('grid_jd', (n_steps,), np.float64)
+    jd.fill(jd0)
+    fr = np.divide(offsets, 86400.0, out=_buf('grid_fr', (n_steps,), np.float64))
+    fr += fr0
+    return jd, fr, offsets
+
+
+def _julian_dates(start_date: datetime, offsets):
+    """Whole and fractional UTC Julian dates for ``offsets`` seconds after ``start_date``."""
+    jd0, fr0 = jday(start_date.year, start_date.month, start_date.day,
+                    start_date.hour, start_date.minute, start_date.second)
+    offsets = np.asarray(offsets, dtype=float)
+    return np.full(offsets.shape, jd0), fr0 + offsets / 86400.0
+
+
+def propagate_teme(satellites, jd, fr, buffer: str = None, out=None):
+    """Propagate several satellites over the same Julian-date grid in one SGP4 batch call.
+
+    Returns an (M, 3, N) array of TEME positions in km. Steps where SGP4 reports an error
+    are NaN, so they fail every obstruction/range comparison downstream. If ``buffer`` is
+    given, SGP4 writes into thread-local pooled arrays under that name instead of new ones;
+    ``out`` may supply the (M, N, 3) float64 position array itself (e.g. in shared memory).
+    Pooling needs the compiled ``SatrecArray``; without it results are copied into ``out``.
+    """
+    sat_array = SatrecArray([sat.model for sat in satellites])
+    if not hasattr(sat_array, '_sgp4'):
+        # sgp4's pure-Python fallback only offers the allocating public API
+        _, r, _ = sat_array.sgp4(jd, fr)
+        if out is not None:
+            out[...] = r
+            r = out
+    elif buffer is None and out is None:
+        _, r, _ = sat_array.sgp4(jd, fr)
+    else:
+        buffer = buffer or 'propagate'
+        shape = (len(satellites), len(jd))
+        e = _buf(buffer + '_e', shape, np.uint8)
+        r = out if out is not None else _buf(buffer + '_r', shape + (3,), np.float64)
+        v = _buf(buffer + '_v', shape + (3,), np.float64)
+        sat_array._sgp4(jd, fr, e, r, v)
+    return r.transpose(0, 2, 1)
+
+
+def teme_to_geodetic(r_teme_km, t):
+    """Convert (3, K) TEME positions at Skyfield Time ``t`` to WGS84 geodetic coordinates.
+
+    TEME is rotated into the Earth-fixed frame by Greenwich mean sidereal time (polar motion
+    ignored), then converted with Bowring's closed-form latitude.
+    Returns ``(lat_deg, lon_deg, altitude_km)`` arrays.
+    """
+    theta = t.gmst * (math.pi / 12.0)
+    cos_t = np.cos(theta)
+    sin_t = np.sin(theta)
+    x = cos_t * r_teme_km[0] + sin_t * r_teme_km[1]
+    y = -sin_t * r_teme_km[0] + cos_t * r_teme_km[1]
+    z = r_teme_km[2]
+
+    a = EARTH_RADIUS_KM
+    b = a * (1.0 - WGS84_FLATTENING)
+    ep2 = WGS84_E2 / (1.0 - WGS84_E2)
+    p = np.hypot(x, y)
+    u = np.arctan2(z * a, p * b)
+    lat = np.arctan2(z + ep2 * b * np.sin(u) ** 3, p - WGS84_E2 * a * np.cos(u) ** 3)
+    lon = np.arctan2(y, x)
+    sin_lat = np.sin(lat)
+    alt_km = p * np.cos(lat) + z * sin_lat - a * np.sqrt(1.0 - WGS84_E2 * sin_lat ** 2)
+    return np.degrees(lat), np.degrees(lon), alt_km
+
+
+def _norm3(r):
+    """Euclidean norm of a 3-vector (tuple/list/array) without NumPy dispatch."""
+    return math.sqrt(r[0] * r[0] + r[1] * r[1] + r[2] * r[2])
+
+
 def calculate_distance_eci_km(r1_km, r2_km):
-    """3D Euclidean distance between two ECI position vectors in km."""
-    r1 = np.array(r1_km, dtype=float)
-    r2 = np.array(r2_km, dtype=float)
-    return float(np.linalg.norm(r2 - r1))
+    """3D Euclidean distance between ECI position vectors in km.
+
+    Accepts single 3-vectors or (3, N) arrays of positions and reduces along axis 0.
+    Single vectors take a plain-Python path and return a float.
+    """
+    if np.isscalar(r1_km[0]):
+        return _norm3((r2_km[0] - r1_km[0], r2_km[1] - r1_km[1], r2_km[2] - r1_km[2]))
+    d = np.asarray(r2_km, dtype=float) - np.asarray(r1_km, dtype=float)
+    return np.sqrt(np.einsum('i...,i...->...', d, d))
 
 
-def is_earth_obstructed(r1_km, r2_km, earth_radius_km: float = EARTH_RADIUS_KM) -> bool:
-    """Determine if Earth obstructs line-of-sight between two ECI position vectors.
+def is_earth_obstructed(r1_km, r2_km, earth_radius_km: float = EARTH_RADIUS_KM):
+    """Determine if Earth obstructs line-of-sight between ECI position vectors.
 
     Uses closest approach from Earth's center (origin) to the line segment r(t)=r1+t*(r2-r1), t in [0,1].
     If the minimum distance from origin to the line segment is below Earth's radius, LoS is blocked.
+    Accepts single 3-vectors or (3, N) arrays and returns a boolean (array) along axis 0.
+    Single vectors take a plain-Python path and return a bool.
     """
-    r1 = np.array(r1_km, dtype=float)
-    r2 = np.array(r2_km, dtype=float)
-    d = r2 - r1
-    d2 = float(np.dot(d, d))
+    if np.isscalar(r1_km[0]):
+        return _is_earth_obstructed_vec3(r1_km, r2_km, earth_radius_km)
+    min_dist_sq, d2 = _closest_approach_sq(r1_km, r2_km)
+    # Identical positions (d2 == 0) are treated as obstructed to be safe
+    return (min_dist_sq < earth_radius_km ** 2) | (d2 == 0.0)
+
+
+def _is_earth_obstructed_vec3(r1_km, r2_km, earth_radius_km: float) -> bool:
+    """Scalar ``is_earth_obstructed`` for a single pair of 3-vectors."""
+    x1, y1, z1 = r1_km[0], r1_km[1], r1_km[2]
+    dx = r2_km[0] - x1
+    dy = r2_km[1] - y1
+    dz = r2_km[2] - z1
+    d2 = dx * dx + dy * dy + dz * dz
     if d2 == 0.0:
         # Identical positions; treat as obstructed to be safe
         return True
-    t_star = -float(np.dot(r1, d)) / d2
-    t_star_clamped = max(0.0, min(1.0, t_star))
-    closest = r1 + t_star_clamped * d
-    min_dist_km = float(np.linalg.norm(closest))
-    return min_dist_km < earth_radius_km
+    t_star = -(x1 * dx + y1 * dy + z1 * dz) / d2
+    t_star = max(0.0, min(1.0, t_star))
+    cx = x1 + t_star * dx
+    cy = y1 + t_star * dy
+    cz = z1 + t_star * dz
+    return bool(cx * cx + cy * cy + cz * cz < earth_radius_km * earth_radius_km)
 
 
-def calculate_interlink_windows(sat1: Satellite, sat2: Satellite, start_date: datetime, end_date: datetime,
-                                time_step: int = DEFAULT_TIME_STEP_SEC, max_range_km: float = DEFAULT_COMM_RANGE_KM):
-    """Calculate inter-satellite communication windows using SGP4 propagation with Earth obstruction."""
-    interlink_windows = []
-    current_date = start_date
+def _closest_approach_sq(r1_km, r2_km):
+    """Squared minimum distance from the origin to segment r1->r2, and the squared segment length.
+
+    Both comparisons downstream work on squared values, so no ``sqrt`` is taken here.
+    """
+    r1 = np.asarray(r1_km, dtype=float)
+    r2 = np.asarray(r2_km, dtype=float)
+    d = r2 - r1
+    d2 = np.einsum('i...,i...->...', d, d)
+    t_star = np.clip(-np.einsum('i...,i...->...', r1, d) / np.where(d2 == 0.0, 1.0, d2), 0.0, 1.0)
+    closest = r1 + t_star * d
+    return np.einsum('i...,i...->...', closest, closest), d2
+
+
+def _visibility_margin(sat1: Satellite, sat2: Satellite, start_date: datetime, offsets,
+                       earth_radius_km: float, max_range_km: float):
+    """Signed visibility margin (km^2) at ``offsets`` seconds after ``start_date``.
+
+    Positive when the link is clear of the Earth and within range, negative otherwise. It is
+    the smaller of the squared range margin and the squared obstruction margin, so it changes
+    sign exactly where either condition does.
+    """
+    jd, fr = _julian_dates(start_date, offsets)
+    r1_km, r2_km = propagate_teme([sat1, sat2], jd, fr)
+    min_dist_sq, d2 = _closest_approach_sq(r1_km, r2_km)
+    margin = np.minimum(max_range_km ** 2 - d2, min_dist_sq - earth_radius_km ** 2)
+    return np.where(d2 == 0.0, -np.inf, margin)
+
+
+def refine_crossings(sat1: Satellite, sat2: Satellite, start_date: datetime, lo, hi,
+                     earth_radius_km: float = EARTH_RADIUS_KM, max_range_km: float = DEFAULT_COMM_RANGE_KM,
+                     tolerance_sec: float = REFINE_TOLERANCE_SEC):
+    """Locate visibility transitions bracketed by sample offsets ``[lo, hi]`` (seconds).
+
+    Each bracket must have opposite visibility at its ends. All brackets are bisected
+    together, so every iteration is a single batch SGP4 call for both satellites.
+    Returns the crossing offsets in seconds from ``start_date``.
+    """
+    lo = np.array(lo, dtype=float)
+    hi = np.array(hi, dtype=float)
+    if lo.size == 0:
+        return lo
+    visible_lo = _visibility_margin(sat1, sat2, start_date, lo, earth_radius_km, max_range_km) > 0.0
+
+    while np.max(hi - lo) > tolerance_sec:
+        mid = 0.5 * (lo + hi)
+        same_as_lo = (_visibility_margin(sat1, sat2, start_date, mid,
+                                         earth_radius_km, max_range_km) > 0.0) == visible_lo
+        lo = np.where(same_as_lo, mid, lo)
+        hi = np.where(same_as_lo, hi, mid)
+
+    return 0.5 * (lo + hi)
+
+
+def _filter_windows_numpy(r1_km, r2_km, earth_radius_km: float, max_range_km: float,
+                         mask=None, distance_sq=None):
+    """NumPy obstruction + range filter over (3, N) ECI arrays. Returns (mask, distance_sq).
+
+    Works in the dtype of ``r1_km`` (float32 or float64). Intermediates are written into
+    thread-local pooled buffers; ``mask`` and ``distance_sq`` may be supplied as output
+    arrays, otherwise new ones are allocated.
+    """
+    n = r1_km.shape[1]
+    dtype = r1_km.dtype
+    if mask is None:
+        mask = np.empty(n, np.bool_)
+    if distance_sq is None:
+        distance_sq = np.empty(n, dtype)
+
+    d = np.subtract(r2_km, r1_km, out=_buf('filter_d', (3, n), dtype))
+    np.einsum('ij,ij->j', d, d, out=distance_sq)
+
+    # Clamped closest-approach parameter t* = -(r1 . d) / |d|^2
+    t_star = np.einsum('ij,ij->j', r1_km, d, out=_buf('filter_t', (n,), dtype))
+    safe_d2 = _buf('filter_safe_d2', (n,), dtype)
+    np.copyto(safe_d2, distance_sq)
+    safe_d2[distance_sq == 0.0] = 1.0
+    np.divide(t_star, safe_d2, out=t_star)
+    np.negative(t_star, out=t_star)
+    np.clip(t_star, 0.0, 1.0, out=t_star)
+
+    closest = np.multiply(d, t_star, out=d)
+    closest += r1_km
+    min_dist_sq = np.einsum('ij,ij->j', closest, closest, out=safe_d2)
+
+    np.greater_equal(min_dist_sq, earth_radius_km ** 2, out=mask)
+    mask &= distance_sq != 0.0
+    mask &= distance_sq <= max_range_km ** 2
+    return mask, distance_sq
+
+
+if njit is not None:
+    # fastmath without 'nnan'/'ninf': NaN rows from SGP4 errors must keep failing the comparisons
+    @njit(parallel=True, cache=True, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'})
+    def _filter_windows_numba(r1_km, r2_km, earth_radius_km, max_range_km, mask, distance_sq):
+        """Fused, parallel equivalent of ``_filter_windows_numpy`` without (3, N) temporaries.
+
+        Not safe to call concurrently under every Numba threading layer; go through
+        ``filter_windows``, which holds ``_numba_lock``.
+        """
+        n = r1_km.shape[1]
+        earth_r2 = earth_radius_km * earth_radius_km
+        max_r2 = max_range_km * max_range_km
+        for i in prange(n):
+            x1 = r1_km[0, i]
+            y1 = r1_km[1, i]
+            z1 = r1_km[2, i]
+            dx = r2_km[0, i] - x1
+            dy = r2_km[1, i] - y1
+            dz = r2_km[2, i] - z1
+            d2 = dx * dx + dy * dy + dz * dz
+            distance_sq[i] = d2
+            if d2 == 0.0:
+                # Identical positions; treat as obstructed to be safe
+                mask[i] = False
+                continue
+            t_star = -(x1 * dx + y1 * dy + z1 * dz) / d2
+            t_star = min(1.0, max(0.0, t_star))
+            cx = x1 + t_star * dx
+            cy = y1 + t_star * dy
+            cz = z1 + t_star * dz
+            mask[i] = cx * cx + cy * cy + cz * cz >= earth_r2 and d2 <= max_r2
+        return mask, distance_sq
+
+
+def _filter_windows_numexpr(r1_km, r2_km, earth_radius_km: float, max_range_km: float,
+                           mask, distance_sq):
+    """numexpr equivalent of ``_filter_windows_numpy``: blocked, multi-threaded passes.
+
+    The clamped closest approach is tested algebraically from |r1|^2, |r2|^2 and r1 . r2, so
+    no expression recomputes the separation vector. With ``d = r2 - r1`` the segment's
+    closest point is an endpoint when ``r1 . d >= 0`` or ``r2 . d <= 0``; otherwise its
+    squared distance is ``|r1|^2 - (r1 . d)^2 / d2``, compared without dividing.
+    Constants are passed with the input dtype, since float literals would upcast float32.
+    """
+    n = r1_km.shape[1]
+    dtype = r1_km.dtype
+    scalar = dtype.type
+    variables = {
+        'r1x': r1_km[0], 'r1y': r1_km[1], 'r1z': r1_km[2],
+        'r2x': r2_km[0], 'r2y': r2_km[1], 'r2z': r2_km[2],
+        'earth_r2': scalar(earth_radius_km ** 2), 'max_r2': scalar(max_range_km ** 2),
+        'zero': scalar(0.0),
+        'd2': distance_sq,
+    }
+    numexpr.evaluate('(r2x - r1x)**2 + (r2y - r1y)**2 + (r2z - r1z)**2',
+                     local_dict=variables, out=distance_sq)
+    variables['s1'] = numexpr.evaluate('r1x * r1x + r1y * r1y + r1z * r1z', local_dict=variables,
+                                       out=_buf('filter_s1', (n,), dtype))
+    variables['s2'] = numexpr.evaluate('r2x * r2x + r2y * r2y + r2z * r2z', local_dict=variables,
+                                       out=_buf('filter_s2', (n,), dtype))
+    variables['dot'] = numexpr.evaluate('r1x * r2x + r1y * r2y + r1z * r2z', local_dict=variables,
+                                        out=_buf('filter_dot', (n,), dtype))
+
+    # Both endpoints above the surface, and the interior minimum too when it lies on the segment
+    numexpr.evaluate(
+        '(d2 != zero) & (d2 <= max_r2) & (s1 >= earth_r2) & (s2 >= earth_r2)'
+        ' & ((s1 <= dot) | (s2 <= dot) | (s1 * d2 - (s1 - dot)**2 >= earth_r2 * d2))',
+        local_dict=variables, out=mask)
+    return mask, distance_sq
+
+
+def filter_windows(r1_km, r2_km, earth_radius_km: float = EARTH_RADIUS_KM,
+                   max_range_km: float = DEFAULT_COMM_RANGE_KM):
+    """Combined Earth obstruction + range filter over (3, N) ECI arrays.
+
+    Returns ``(mask, distance_sq)`` where ``mask`` is True for steps with line-of-sight within
+    range and ``distance_sq`` is the squared separation in km^2. Positions are cast to
+    ``FILTER_DTYPE`` first: float32 keeps ~0.5 m resolution at LEO radii, ample for range and
+    obstruction decisions, and halves the memory traffic of the kernel. Steps the kernel keeps
+    are re-checked against ``max_range_km`` in float64, and callers report distances from the
+    float64 positions (see ``_selected_distance_sq``). Uses numexpr when
+    ``USE_NUMEXPR`` is set and numexpr is installed, else the Numba kernel when Numba is
+    installed, else plain NumPy. All arrays involved live in the thread-local buffer pool.
+    """
+    r1_km = np.asarray(r1_km)
+    r2_km = np.asarray(r2_km)
+    n = r1_km.shape[1]
+    r1_f = _buf('filter_r1', (3, n), FILTER_DTYPE)
+    r2_f = _buf('filter_r2', (3, n), FILTER_DTYPE)
+    np.copyto(r1_f, r1_km, casting='same_kind')
+    np.copyto(r2_f, r2_km, casting='same_kind')
+    mask = _buf('filter_mask', (n,), np.bool_)
+    distance_sq = _buf('filter_distance_sq', (n,), FILTER_DTYPE)
+    if USE_NUMEXPR and numexpr is not None:
+        _filter_windows_numexpr(r1_f, r2_f, earth_radius_km, max_range_km, mask, distance_sq)
+    elif njit is not None:
+        scalar = np.dtype(FILTER_DTYPE).type
+        with _numba_lock:
+            _filter_windows_numba(r1_f, r2_f, scalar(earth_radius_km), scalar(max_range_km),
+                                  mask, distance_sq)
+    else:
+        _filter_windows_numpy(r1_f, r2_f, earth_radius_km, max_range_km, mask, distance_sq)
+
+    # float32 rounding can admit a step just beyond max_range_km; re-check the kept steps in
+    # float64 so every reported distance stays within range
+    kept = np.flatnonzero(mask)
+    mask[kept[_selected_distance_sq(r1_km, r2_km, kept) > max_range_km ** 2]] = False
+    return mask, distance_sq
+
+
+def _selected_distance_sq(r1_km, r2_km, indices):
+    """Full-precision squared distances (km^2) for the selected columns of (3, N) arrays."""
+    d = r2_km[:, indices] - r1_km[:, indices]
+    return np.einsum('ij,ij->j', d, d)
+
+
+def _normalize_span(start_date: datetime, end_date: datetime, time_step: int):
+    """Validate ``time_step``, make both dates UTC-aware and return ``(start_date, n_steps)``."""
+    if time_step <= 0:
+        raise ValueError('time_step must be a positive number of seconds')
 
     # Ensure timezone-aware UTC
-    if current_date.tzinfo is None:
-        current_date = current_date.replace(tzinfo=timezone.utc)
+    if start_date.tzinfo is None:
+        start_date = start_date.replace(tzinfo=timezone.utc)
     if end_date.tzinfo is None:
         end_date = end_date.replace(tzinfo=timezone.utc)
 
-    while current_date <= end_date:
-        pos1 = sat1.get_position(current_date)
-        pos2 = sat2.get_position(current_date)
+    n_steps = int((end_date - start_date).total_seconds() // time_step) + 1
+    return start_date, n_steps
+
+
+def _propagate_and_filter(sat1: Satellite, sat2: Satellite, start_date: datetime, n_steps: int,
+                          time_step: int, max_range_km: float, first_step: int = 0):
+    """Propagate both satellites over ``n_steps`` grid samples and apply the window filter.
+
+    Returns ``(offsets, r1_km, r2_km, mask, distance_sq)`` with (3, N) TEME arrays; all but
+    ``offsets`` live in the thread-local buffer pool.
+    """
+    jd, fr, offsets = build_time_grid(start_date, n_steps, time_step, first_step)
+
+    # (3, N) TEME position arrays in km
+    r1_km, r2_km = propagate_teme([sat1, sat2], jd, fr, buffer='grid')
+
+    mask, distance_sq = filter_windows(r1_km, r2_km, max_range_km=max_range_km)
+    return offsets, r1_km, r2_km, mask, distance_sq
+
+
+def _interlink_samples(sat1: Satellite, sat2: Satellite, start_date: datetime, end_date: datetime,
+                       time_step: int, max_range_km: float):
+    """Propagate both satellites over the whole time grid and apply the obstruction + range filter.
+
+    Returns ``(start_date, offsets, r1_km, r2_km, mask, distance_sq)`` with (3, N) TEME arrays,
+    or None when the grid is empty.
+    """
+    start_date, n_steps = _normalize_span(start_date, end_date, time_step)
+    if n_steps <= 0:
+        return None
+    return (start_date,) + _propagate_and_filter(sat1, sat2, start_date, n_steps, time_step, max_range_km)
+
+
+def _timestamp(start_date: datetime, offset_sec) -> str:
+    """ISO-8601 timestamp ``offset_sec`` seconds after ``start_date`` (millisecond resolution)."""
+    return (start_date + timedelta(seconds=round(float(offset_sec), 3))).isoformat()
+
 
-        r1 = pos1['eci_km']
-        r2 = pos2['eci_km']
+@dataclass
+class Window:
+    """One visible timestep between two satellites (positions in degrees / km).
+
+    Slotted to keep per-record overhead low for long window lists; ``to_json`` gives the
+    response shape. ``__slots__`` is spelled out rather than using
+    ``dataclass(slots=True)``, which needs Python 3.10.
+    """
+    __slots__ = ('ts', 'd', 'lat1', 'lon1', 'alt1', 'lat2', 'lon2', 'alt2')
+    ts: str
+    d: float
+    lat1: float
+    lon1: float
+    alt1: float
+    lat2: float
+    lon2: float
+    alt2: float
+
+    def to_json(self):
+        """Response dict for this window."""
+        return {
+            'timestamp': self.ts,
+            'sat1_pos': {'lat': self.lat1, 'lon': self.lon1, 'altitude': self.alt1},
+            'sat2_pos': {'lat': self.lat2, 'lon': self.lon2, 'altitude': self.alt2},
+            'distance': self.d,
+            'can_communicate': True
+        }
+
+
+def calculate_interlink_windows(sat1: Satellite, sat2: Satellite, start_date: datetime, end_date: datetime,
+                                time_step: int = DEFAULT_TIME_STEP_SEC, max_range_km: float = DEFAULT_COMM_RANGE_KM,
+                                max_windows: int = None, first_only: bool = False):
+    """Calculate inter-satellite communication windows using SGP4 propagation with Earth obstruction.
+
+    This is a generator of ``Window`` records. Both satellites are propagated with one ``SatrecArray`` call per
+    block of ``WINDOW_CHUNK_STEPS`` samples, and a block is only computed once the previous
+    one has been consumed, so stopping early (``max_windows``, ``first_only`` or simply not
+    iterating further) skips the rest of the horizon. Obstruction and range are
+    frame-invariant, so they are evaluated directly in TEME; only the rows that are yielded
+    are converted to geodetic.
+    """
+    for block in _interlink_window_blocks(sat1, sat2, start_date, end_date, time_step, max_range_km,
+                                          max_windows, first_only):
+        yield from block
+
+
+def _interlink_window_blocks(sat1: Satellite, sat2: Satellite, start_date: datetime, end_date: datetime,
+                             time_step: int, max_range_km: float, max_windows: int, first_only: bool):
+    """``calculate_interlink_windows`` one non-empty list of ``Window`` records per block."""
+    if first_only:
+        max_windows = 1
+
+    start_date, n_steps = _normalize_span(start_date, end_date, time_step)
+    emitted = 0
+
+    for first_step in range(0, n_steps, WINDOW_CHUNK_STEPS):
+        if max_windows is not None and emitted >= max_windows:
+            return
+        block_steps = min(WINDOW_CHUNK_STEPS, n_steps - first_step)
+        offsets, r1_km, r2_km, mask, distance_sq = _propagate_and_filter(
+            sat1, sat2, start_date, block_steps, time_step, max_range_km, first_step
+        )
+
+        indices = np.flatnonzero(mask)
+        if max_windows is not None:
+            indices = indices[:max_windows - emitted]
+        if indices.size == 0:
+            continue
+
+        # Geodetic coordinates are only needed for the response, so the Earth-fixed rotation
+        # is evaluated for the surviving rows only. Everything read below is copied out of
+        # the buffer pool before the first yield.
+        t = _ts.utc(start_date.year, start_date.month, start_date.day,
+                    start_date.hour, start_date.minute, start_date.second + offsets[indices])
+        lat1, lon1, alt1 = (a.tolist() for a in teme_to_geodetic(r1_km[:, indices], t))
+        lat2, lon2, alt2 = (a.tolist() for a in teme_to_geodetic(r2_km[:, indices], t))
+        distance_km = np.sqrt(_selected_distance_sq(r1_km, r2_km, indices)).tolist()
+        timestamps = [_timestamp(start_date, offset) for offset in offsets[indices]]
+
+        yield list(map(Window, timestamps, distance_km, lat1, lon1, alt1, lat2, lon2, alt2))
+
+        emitted += indices.size
+
+
+def _mask_runs(mask):
+    """Start (inclusive) and end (exclusive) indices of each run of True values in ``mask``."""
+    # Rising/falling edges of the mask delimit the runs
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _run_distance_bounds(r1_km, r2_km, run_starts, run_ends):
+    """Per-run minimum and maximum squared distance, recomputed in float64 for run rows only."""
+    lengths = run_ends - run_starts
+    if lengths.size == 0:
+        return np.empty(0), np.empty(0)
+    # Runs tile the selected rows contiguously, so each run is one reduceat segment
+    segments = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    rows = np.arange(lengths.sum()) + np.repeat(run_starts - segments, lengths)
+    distance_sq = _selected_distance_sq(r1_km, r2_km, rows)
+    return np.minimum.reduceat(distance_sq, segments), np.maximum.reduceat(distance_sq, segments)
+
+
+def _interval_dicts(start_date: datetime, start_sec, end_sec, min_sq, max_sq, samples):
+    """Build response dicts for visibility intervals from their per-run arrays."""
+    return [{
+        'start': _timestamp(start_date, start_sec[k]),
+        'end': _timestamp(start_date, end_sec[k]),
+        'duration': round(float(end_sec[k] - start_sec[k]), 3),
+        'min_distance': math.sqrt(min_sq[k]),
+        'max_distance': math.sqrt(max_sq[k]),
+        'samples': int(samples[k]),
+    } for k in range(len(start_sec))]
+
+
+def calculate_interlink_intervals(sat1: Satellite, sat2: Satellite, start_date: datetime, end_date: datetime,
+                                  time_step: int = DEFAULT_TIME_STEP_SEC,
+                                  max_range_km: float = DEFAULT_COMM_RANGE_KM, refine: bool = True):
+    """Calculate communication windows coalesced into contiguous visibility intervals.
+
+    Returns one dict per run of consecutive passing timesteps (start/end timestamps, duration,
+    min/max distance and sample count) rather than one dict per timestep. With ``refine``,
+    entry/exit times inside the simulation span are bisected between the bracketing samples
+    instead of being snapped to the grid; min/max distance remain sample-based.
+    """
+    samples = _interlink_samples(sat1, sat2, start_date, end_date, time_step, max_range_km)
+    if samples is None:
+        return []
+    start_date, offsets, r1_km, r2_km, mask, _ = samples
+
+    run_starts, run_ends = _mask_runs(mask)
+    min_sq, max_sq = _run_distance_bounds(r1_km, r2_km, run_starts, run_ends)
+
+    start_sec = offsets[run_starts].astype(float)
+    end_sec = offsets[run_ends - 1].astype(float)
+    if refine:
+        # Runs touching either end of the grid have no bracketing sample outside them
+        entering = run_starts > 0
+        exiting = run_ends < offsets.size
+        start_sec[entering] = refine_crossings(sat1, sat2, start_date, offsets[run_starts[entering] - 1],
+                                               offsets[run_starts[entering]], max_range_km=max_range_km)
+        end_sec[exiting] = refine_crossings(sat1, sat2, start_date, offsets[run_ends[exiting] - 1],
+                                            offsets[run_ends[exiting]], max_range_km=max_range_km)
+
+    return _interval_dicts(start_date, start_sec, end_sec, min_sq, max_sq, run_ends - run_starts)
 
-        if not is_earth_obstructed(r1, r2):
-            distance_km = calculate_distance_eci_km(r1, r2)
-            if distance_km <= max_range_km:
-                interlink_windows.append({
-                    'timestamp': current_date.isoformat(),
-                    'sat1_pos': {k: pos1[k] for k in ['lat', 'lon', 'altitude']},
-                    'sat2_pos': {k: pos2[k] for k in ['lat', 'lon', 'altitude']},
-                    'distance': distance_km,
-                    'can_communicate': True
-                })
 
-        current_date += timedelta(seconds=time_step)
+def _pair_runs(positions, i: int, j: int, max_range_km: float):
+    """Visibility runs between satellites ``i`` and ``j`` of an (M, N, 3) position array.
+
+    Returns ``(run_starts, run_ends, min_sq, max_sq)``; small enough to send between processes.
+    """
+    r1_km = positions[i].T
+    r2_km = positions[j].T
+    mask, _ = filter_windows(r1_km, r2_km, max_range_km=max_range_km)
+    run_starts, run_ends = _mask_runs(mask)
+    return (run_starts, run_ends) + _run_distance_bounds(r1_km, r2_km, run_starts, run_ends)
+
+
+def _pair_runs_shared(shm_name: str, shape, i: int, j: int, max_range_km: float):
+    """Process-pool entry point: ``_pair_runs`` on positions held in shared memory."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        positions = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        result = _pair_runs(positions, i, j, max_range_km)
+        del positions
+        return result
+    finally:
+        shm.close()
+
+
+def _init_pair_worker():
+    """Pool initializer: one Numba thread per worker, since the pool already uses every CPU."""
+    if njit is not None:
+        set_num_threads(1)
+
+
+def _get_pair_pool() -> ProcessPoolExecutor:
+    """Shared process pool for all-pairs analysis (spawned workers, one per CPU)."""
+    global _pair_pool
+    with _pair_pool_lock:
+        if _pair_pool is None:
+            _pair_pool = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=get_context('spawn'),
+                                             initializer=_init_pair_worker)
+        return _pair_pool
+
+
+def _discard_pair_pool(pool: ProcessPoolExecutor):
+    """Drop a broken ``pool`` so the next ``_get_pair_pool`` call starts a fresh one."""
+    global _pair_pool
+    with _pair_pool_lock:
+        if _pair_pool is pool:
+            _pair_pool = None
+    pool.shutdown(wait=False)
+
+
+def calculate_interlink_many(satellites, start_date: datetime, end_date: datetime,
+                             time_step: int = DEFAULT_TIME_STEP_SEC, max_range_km: float = DEFAULT_COMM_RANGE_KM,
+                             parallel: bool = None):
+    """Calculate visibility intervals for every pair of a list of satellites.
+
+    All M satellites are propagated once with a single ``SatrecArray`` call into an (M, N, 3)
+    array. The M*(M-1)/2 pair filters then run in a process pool, reading the positions from
+    shared memory rather than pickled copies. ``parallel=None`` uses the pool only when
+    ``pairs * N >= PARALLEL_MIN_PAIR_STEPS``. If a worker dies, the pool is replaced for
+    later calls and this one finishes inline. Intervals are at grid resolution (no bisection).
+    Returns one ``{'sat1', 'sat2', 'intervals', 'total_intervals'}`` dict per pair.
+    """
+    start_date, n_steps = _normalize_span(start_date, end_date, time_step)
+    pairs = list(combinations(range(len(satellites)), 2))
+    if n_steps <= 0 or not pairs:
+        return [{'sat1': satellites[i].name, 'sat2': satellites[j].name, 'intervals': [], 'total_intervals': 0}
+                for i, j in pairs]
+
+    if parallel is None:
+        parallel = len(pairs) * n_steps >= PARALLEL_MIN_PAIR_STEPS
+
+    jd, fr, offsets = build_time_grid(start_date, n_steps, time_step)
+    shape = (len(satellites), n_steps, 3)
+
+    if parallel:
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+        positions = None
+        try:
+            positions = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            propagate_teme(satellites, jd, fr, out=positions)
+            pool = _get_pair_pool()
+            try:
+                runs = list(pool.map(
+                    _pair_runs_shared, repeat(shm.name), repeat(shape),
+                    [i for i, _ in pairs], [j for _, j in pairs], repeat(max_range_km),
+                    chunksize=max(1, len(pairs) // (4 * (os.cpu_count() or 1)))
+                ))
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed): start a fresh pool next time, finish inline
+                _discard_pair_pool(pool)
+                runs = [_pair_runs(positions, i, j, max_range_km) for i, j in pairs]
+        finally:
+            del positions
+            shm.close()
+            shm.unlink()
+    else:
+        positions = propagate_teme(satellites, jd, fr).transpose(0, 2, 1)
+        runs = [_pair_runs(positions, i, j, max_range_km) for i, j in pairs]
+
+    results = []
+    for (i, j), (run_starts, run_ends, min_sq, max_sq) in zip(pairs, runs):
+        intervals = _interval_dicts(start_date, offsets[run_starts], offsets[run_ends - 1],
+                                    min_sq, max_sq, run_ends - run_starts)
+        results.append({
+            'sat1': satellites[i].name,
+            'sat2': satellites[j].name,
+            'intervals': intervals,
+            'total_intervals': len(intervals),
+        })
+    return results
 
-    return interlink_windows
+
+def validate_tles(tles):
+    """Validate many TLEs with a single batch SGP4 propagation at the current time.
+
+    ``tles`` is a list of ``{"l1": ..., "l2": ...}`` dicts with an optional ``name``. Returns
+    one ``{'index', 'valid', 'error'}`` dict per entry, in input order.
+    """
+    results = [None] * len(tles)
+    satellites = []
+    for i, tle in enumerate(tles):
+        if not isinstance(tle, dict):
+            results[i] = {'index': i, 'valid': False, 'error': 'each entry must be an {l1, l2} object'}
+            continue
+        try:
+            satellites.append((i, Satellite(tle.get('name', 'test'), tle['l1'], tle['l2'])))
+        except Exception as e:
+            results[i] = {'index': i, 'valid': False, 'error': str(e)}
+
+    if satellites:
+        now = datetime.now(timezone.utc)
+        jd, fr = jday(now.year, now.month, now.day, now.hour, now.minute, now.second)
+        errors, _, _ = SatrecArray([sat.model for _, sat in satellites]).sgp4(np.array([jd]), np.array([fr]))
+        for (i, _), code in zip(satellites, errors[:, 0]):
+            code = int(code)
+            results[i] = {
+                'index': i,
+                'valid': code == 0,
+                'error': SGP4_ERRORS.get(code, f'SGP4 error {code}') if code else None,
+            }
+
+    return results
+
+
+def _stream_json(envelope, list_key: str, count_key: str, blocks, chunk_size: int = STREAM_CHUNK_SIZE):
+    """Stream ``envelope`` plus ``list_key`` (a JSON array) and ``count_key`` (its length).
+
+    The array is the concatenation of ``blocks``, an iterable of lists of JSON-ready items
+    that may be a generator still computing. Each block is encoded with a single C ``json``
+    call, and JSON text is yielded in roughly ``chunk_size`` pieces. The count is only known
+    once ``blocks`` is exhausted, so it is written after the array.
+    """
+    head = json.dumps(envelope)
+    buffer = [head[:-1] + (', ' if envelope else '') + json.dumps(list_key) + ': [']
+    size = len(buffer[0])
+    count = 0
+    for block in blocks:
+        if not block:
+            continue
+        chunk = json.dumps(block)[1:-1]
+        buffer.append(', ' + chunk if count else chunk)
+        size += len(chunk) + 2
+        count += len(block)
+        if size >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    buffer.append('], ' + json.dumps(count_key) + ': ' + json.dumps(count) + '}')
+    yield ''.join(buffer)
 
 
 @app.route('/')
@@ -139,29 +872,92 @@ def calculate_interlink():
         # Optional parameters
         time_step = int(data.get('time_step', DEFAULT_TIME_STEP_SEC))
         max_range_km = float(data.get('max_range_km', DEFAULT_COMM_RANGE_KM))
+        # 'windows' returns one entry per visible timestep, 'intervals' one per contiguous run;
+        # max_windows / first_only stop the windows search early
+        output = data.get('output', 'windows')
+        if output not in ('windows', 'intervals'):
+            raise ValueError("output must be 'windows' or 'intervals'")
+        max_windows = data.get('max_windows')
+        if max_windows is not None:
+            if not isinstance(max_windows, int) or isinstance(max_windows, bool):
+                raise ValueError('max_windows must be an integer')
+            if max_windows < 0:
+                raise ValueError('max_windows must be non-negative')
+        first_only = data.get('first_only', False)
+        if not isinstance(first_only, bool):
+            raise ValueError('first_only must be true or false')
+        if output == 'intervals' and (max_windows is not None or first_only):
+            raise ValueError("max_windows and first_only only apply to output 'windows'")
 
         # Create satellite objects (validates TLEs implicitly)
         sat1 = Satellite(sat1_name, sat1_tle1, sat1_tle2)
         sat2 = Satellite(sat2_name, sat2_tle1, sat2_tle2)
 
-        # Calculate interlink windows
-        interlink_windows = calculate_interlink_windows(
-            sat1, sat2, start_date, end_date, time_step=time_step, max_range_km=max_range_km
-        )
-
         # Get initial positions for visualization
         initial_pos1 = sat1.get_position(start_date)
         initial_pos2 = sat2.get_position(start_date)
 
-        return jsonify({
+        result = {
             'success': True,
-            'interlink_windows': interlink_windows,
             'initial_positions': {
                 'sat1': {k: initial_pos1[k] for k in ['lat', 'lon', 'altitude']},
                 'sat2': {k: initial_pos2[k] for k in ['lat', 'lon', 'altitude']}
             },
-            'total_windows': len(interlink_windows)
-        })
+        }
+
+        if output == 'intervals':
+            interlink_intervals = calculate_interlink_intervals(
+                sat1, sat2, start_date, end_date, time_step=time_step, max_range_km=max_range_km
+            )
+            body = _stream_json(result, 'interlink_intervals', 'total_intervals', [interlink_intervals])
+        else:
+            blocks = (
+                [window.to_json() for window in block]
+                for block in _interlink_window_blocks(sat1, sat2, start_date, end_date, time_step,
+                                                      max_range_km, max_windows, first_only)
+            )
+            # Compute up to the first block of windows here so that input and propagation errors
+            # still map to a 400; the remaining blocks are computed while the response streams
+            first = list(islice(blocks, 1))
+            body = _stream_json(result, 'interlink_windows', 'total_windows', chain(first, blocks))
+
+        return Response(stream_with_context(body), mimetype='application/json')
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+
+@app.route('/api/calculate-interlink-many', methods=['POST'])
+def calculate_interlink_many_route():
+    try:
+        data = request.get_json()
+
+        # Satellites: [{"name": ..., "l1": ..., "l2": ...}, ...]
+        entries = data['satellites']
+        if not isinstance(entries, list) or len(entries) < 2:
+            raise ValueError('satellites must be a list of at least two {"l1", "l2"} objects')
+        if len(entries) > MAX_MANY_SATELLITES:
+            raise ValueError(f'at most {MAX_MANY_SATELLITES} satellites are supported per request')
+        satellites = [Satellite(entry.get('name', f'Satellite {k + 1}'), entry['l1'], entry['l2'])
+                      for k, entry in enumerate(entries)]
+
+        # Parse date range
+        start_date = datetime.fromisoformat(data['start_date'])
+        end_date = datetime.fromisoformat(data['end_date'])
+
+        # Optional parameters
+        time_step = int(data.get('time_step', DEFAULT_TIME_STEP_SEC))
+        max_range_km = float(data.get('max_range_km', DEFAULT_COMM_RANGE_KM))
+
+        pairs = calculate_interlink_many(
+            satellites, start_date, end_date, time_step=time_step, max_range_km=max_range_km
+        )
+
+        body = _stream_json({'success': True}, 'pairs', 'total_pairs', [pairs])
+        return Response(stream_with_context(body), mimetype='application/json')
 
     except Exception as e:
         return jsonify({
@@ -174,14 +970,22 @@ def calculate_interlink():
 def validate_tle():
     try:
         data = request.get_json()
-        tle_line1 = data['tle_line1']
-        tle_line2 = data['tle_line2']
 
-        # Attempt to create a satellite and compute a position to validate
-        _ = EarthSatellite(tle_line1.strip(), tle_line2.strip(), 'test')
-        now = datetime.now(timezone.utc)
-        t = _ts.utc(now.year, now.month, now.day, now.hour, now.minute, now.second)
-        _.at(t)  # propagate once
+        # Batch form: {"tles": [{"l1": ..., "l2": ...}, ...]}
+        if 'tles' in data:
+            if not isinstance(data['tles'], list):
+                raise ValueError('tles must be a list of {"l1", "l2"} objects')
+            results = validate_tles(data['tles'])
+            return jsonify({
+                'success': True,
+                'results': results,
+                'valid_count': sum(1 for r in results if r['valid'])
+            })
+
+        # Single form goes through the same batch SGP4 check, so both forms agree
+        result = validate_tles([{'l1': data['tle_line1'], 'l2': data['tle_line2']}])[0]
+        if not result['valid']:
+            raise ValueError(result['error'])
 
         return jsonify({
             'success': True,
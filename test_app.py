@@ -5,15 +5,46 @@ Simple test script for the Satellite Interlink Application
 
 import sys
 import os
+import json
+import numpy as np
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
+import app
 from app import (
     Satellite,
+    calculate_interlink_windows,
+    calculate_interlink_intervals,
+    calculate_interlink_many,
     calculate_distance_eci_km,
     is_earth_obstructed,
+    filter_windows,
+    _filter_windows_numpy,
+    build_time_grid,
+    propagate_teme,
+    teme_to_geodetic,
+    validate_tles,
     EARTH_RADIUS_KM,
 )
+from skyfield.api import load, wgs84
+
+# Shared fixtures: two LEO satellites and a one-day analysis span
+ISS_TLE = (
+    "1 25544U 98067A   24001.50000000  .00012227  00000+0  22906-3 0  9999",
+    "2 25544  51.6400 114.3973 0001263 255.8500 104.1500 15.50000000 00000+0",
+)
+STARLINK_1234_TLE = (
+    "1 44713U 19074A   24001.50000000  .00000000  00000+0  00000+0 0  9999",
+    "2 44713  52.9979 288.0000 0001263 180.0000 180.0000 15.05425952 00000+0",
+)
+START = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+END = datetime(2024, 1, 2, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def iss_and_starlink():
+    """The ISS / STARLINK-1234 pair used by the interlink tests"""
+    return Satellite("ISS", *ISS_TLE), Satellite("STARLINK-1234", *STARLINK_1234_TLE)
 
 
 def test_satellite_class():
@@ -21,8 +52,7 @@ def test_satellite_class():
     print("🧪 Testing Satellite class...")
 
     # Sample TLE data (example format)
-    tle_line1 = "1 25544U 98067A   24001.50000000  .00012227  00000+0  22906-3 0  9999"
-    tle_line2 = "2 25544  51.6400 114.3973 0001263 255.8500 104.1500 15.50000000 00000+0"
+    tle_line1, tle_line2 = ISS_TLE
 
     try:
         sat = Satellite("ISS", tle_line1, tle_line2)
@@ -43,6 +73,59 @@ def test_satellite_class():
         return False
 
 
+def test_satellite_cache():
+    """Test that repeated TLEs reuse the cached SGP4 satellite"""
+    print("\n🧪 Testing TLE satellite cache...")
+
+    tle_line1, tle_line2 = ISS_TLE
+
+    try:
+        sat_a = Satellite("ISS", tle_line1, tle_line2)
+        sat_b = Satellite("ISS", tle_line1 + "  ", tle_line2)
+        print(f"✅ Cached satellite reused: {sat_a.model is sat_b.model}")
+
+        assert sat_a.model is sat_b.model
+        return True
+    except Exception as e:
+        print(f"❌ Error in TLE satellite cache: {e}")
+        return False
+
+
+def test_validate_tles():
+    """Test batch TLE validation"""
+    print("\n🧪 Testing batch TLE validation...")
+
+    tles = [
+        {"l1": ISS_TLE[0], "l2": ISS_TLE[1]},
+        {"l1": "not a tle", "l2": "still not a tle"},
+        {"l1": ISS_TLE[0]},
+        "not an object",
+    ]
+
+    try:
+        results = validate_tles(tles)
+        print(f"✅ Validation results: {[r['valid'] for r in results]}")
+
+        assert [r['index'] for r in results] == [0, 1, 2, 3]
+        assert [r['valid'] for r in results] == [True, False, False, False]
+        assert results[3]['error'] == 'each entry must be an {l1, l2} object'
+        assert results[0]['error'] is None
+        assert results[1]['error'] and results[2]['error']
+
+        # The single-TLE route form applies the same rule as the batch form
+        client = app.app.test_client()
+        single = client.post('/api/validate-tle', json={'tle_line1': '1', 'tle_line2': '2'})
+        batch = client.post('/api/validate-tle', json={'tles': [{'l1': '1', 'l2': '2'}]})
+        valid = client.post('/api/validate-tle', json={'tle_line1': tles[0]['l1'], 'tle_line2': tles[0]['l2']})
+        assert single.status_code == 400 and not single.get_json()['success']
+        assert single.get_json()['error'] == batch.get_json()['results'][0]['error']
+        assert valid.status_code == 200 and valid.get_json()['message'] == 'TLE is valid'
+        return True
+    except Exception as e:
+        print(f"❌ Error in batch TLE validation: {e}")
+        return False
+
+
 def test_distance_eci():
     """Test ECI 3D distance calculation"""
     print("\n🧪 Testing ECI distance calculation...")
@@ -84,6 +167,317 @@ def test_earth_obstruction_geometry():
         return False
 
 
+def test_vectorized_geometry():
+    """Test obstruction and distance helpers on (3, N) ECI arrays"""
+    print("\n🧪 Testing vectorized geometry helpers...")
+
+    r = EARTH_RADIUS_KM + 400.0
+    # Columns: same-side pair, opposite-side pair, identical positions
+    r1 = np.array([[r, r, r], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]])
+    r2 = np.array([[r, -r, r], [10.0, 0.0, 0.0], [0.0, 0.0, 0.0]])
+
+    try:
+        obstructed = is_earth_obstructed(r1, r2)
+        distances = calculate_distance_eci_km(r1, r2)
+        print(f"✅ Obstruction mask (expected [False, True, True]): {obstructed}")
+        print(f"✅ Distances: {distances}")
+
+        assert obstructed.tolist() == [False, True, True]
+        assert np.allclose(distances, [10.0, 2 * r, 0.0])
+        return True
+    except Exception as e:
+        print(f"❌ Error in vectorized geometry: {e}")
+        return False
+
+
+def test_teme_geodetic():
+    """Test batch TEME propagation and geodetic conversion against Skyfield"""
+    print("\n🧪 Testing TEME propagation and geodetic conversion...")
+
+    tle_line1, tle_line2 = ISS_TLE
+    start = START
+
+    try:
+        sat = Satellite("ISS", tle_line1, tle_line2)
+        jd, fr, offsets = build_time_grid(start, 30, 120)
+        r_teme = propagate_teme([sat], jd, fr)[0]
+        t = load.timescale().utc(2024, 1, 1, 12, 0, offsets)
+        lat, lon, alt = teme_to_geodetic(r_teme, t)
+
+        geo = wgs84.geographic_position_of(sat.positions_at(t))
+        dlon = (lon - geo.longitude.degrees + 180.0) % 360.0 - 180.0
+        print(f"✅ Max lat/lon error: {np.max(np.abs(lat - geo.latitude.degrees)):.2e}° / {np.max(np.abs(dlon)):.2e}°")
+
+        assert np.allclose(lat, geo.latitude.degrees, atol=1e-3)
+        assert np.allclose(dlon, 0.0, atol=1e-3)
+        assert np.allclose(alt, geo.elevation.km, atol=0.1)
+        return True
+    except Exception as e:
+        print(f"❌ Error in TEME propagation/geodetic conversion: {e}")
+        return False
+
+
+def test_filter_windows():
+    """Test the combined obstruction + range filter against the NumPy reference"""
+    print("\n🧪 Testing combined window filter...")
+
+    rng = np.random.default_rng(0)
+    r1 = rng.uniform(-12000.0, 12000.0, size=(3, 1000))
+    r2 = rng.uniform(-12000.0, 12000.0, size=(3, 1000))
+
+    try:
+        mask, distances = filter_windows(r1, r2, EARTH_RADIUS_KM, 8000.0)
+        ref_mask, ref_distances = _filter_windows_numpy(r1, r2, EARTH_RADIUS_KM, 8000.0)
+        print(f"✅ Filter kept {int(mask.sum())}/{mask.size} steps")
+
+        assert distances.dtype == app.FILTER_DTYPE
+        assert np.array_equal(mask, ref_mask)
+        assert np.allclose(distances, ref_distances)
+
+        # A separation just past max_range_km that rounds into range in float32 is dropped
+        edge = filter_windows(np.array([[7000.0], [0.0], [0.0]]), np.array([[7000.0], [5000.0002], [0.0]]),
+                              EARTH_RADIUS_KM, 5000.0)[0]
+        assert not edge[0]
+
+        # SGP4 error rows (NaN positions) are never reported as visible
+        r_nan = r1.copy()
+        r_nan[:, ref_mask.argmax()] = np.nan
+        assert not filter_windows(r_nan, r2, EARTH_RADIUS_KM, 8000.0)[0][ref_mask.argmax()]
+
+        r1_f, r2_f = r1.astype(np.float32), r2.astype(np.float32)
+        f32_mask, f32_distances = _filter_windows_numpy(r1_f, r2_f, EARTH_RADIUS_KM, 8000.0)
+        print("✅ float32 NumPy kernel checked against float64 reference")
+        assert f32_distances.dtype == np.float32
+        assert np.array_equal(f32_mask, ref_mask)
+        assert np.allclose(f32_distances, ref_distances)
+
+        if app.numexpr is not None:
+            ne_mask, ne_distances = app._filter_windows_numexpr(
+                r1, r2, EARTH_RADIUS_KM, 8000.0, np.empty(1000, np.bool_), np.empty(1000)
+            )
+            print("✅ numexpr kernel checked against NumPy reference")
+            assert np.array_equal(ne_mask, ref_mask)
+            assert np.allclose(ne_distances, ref_distances)
+
+            # The opt-in backend is what filter_windows dispatches to
+            use_numexpr = app.USE_NUMEXPR
+            try:
+                app.USE_NUMEXPR = True
+                assert np.array_equal(filter_windows(r1, r2, EARTH_RADIUS_KM, 8000.0)[0], ref_mask)
+            finally:
+                app.USE_NUMEXPR = use_numexpr
+        return True
+    except Exception as e:
+        print(f"❌ Error in combined window filter: {e}")
+        return False
+
+
+def test_interlink_windows():
+    """Test vectorized interlink window calculation over a time grid"""
+    print("\n🧪 Testing interlink window calculation...")
+
+    sat1, sat2 = iss_and_starlink()
+    start, end = START, END
+
+    try:
+        windows = list(calculate_interlink_windows(sat1, sat2, start, end, time_step=60, max_range_km=5000.0))
+        print(f"✅ Interlink windows calculated: {len(windows)} windows")
+
+        assert len(windows) > 0
+        for w in windows:
+            assert w.d <= 5000.0
+            assert start <= datetime.fromisoformat(w.ts) <= end
+            assert -90.0 <= w.lat1 <= 90.0
+
+        # get_position reports the same height above the ellipsoid as the window rows
+        pos = sat1.get_position(datetime.fromisoformat(windows[0].ts))
+        assert abs(pos['altitude'] - windows[0].alt1) < 0.1
+        assert abs(pos['lat'] - windows[0].lat1) < 0.01
+
+        # Windows serialize to the nested response shape
+        blocks = iter([[w.to_json() for w in windows[:2]], [], [windows[2].to_json()]])
+        streamed = json.loads(''.join(app._stream_json({'success': True}, 'windows', 'total', blocks,
+                                                       chunk_size=1)))
+        assert streamed['success'] and streamed['total'] == 3 and len(streamed['windows']) == 3
+        encoded = streamed['windows'][0]
+        assert encoded['timestamp'] == windows[0].ts
+        assert encoded['sat2_pos'] == {'lat': windows[0].lat2, 'lon': windows[0].lon2,
+                                       'altitude': windows[0].alt2}
+        assert encoded['distance'] == windows[0].d
+
+        # Early termination returns a prefix of the full result
+        first = list(calculate_interlink_windows(sat1, sat2, start, end, time_step=60, max_range_km=5000.0,
+                                                 first_only=True))
+        some = list(calculate_interlink_windows(sat1, sat2, start, end, time_step=60, max_range_km=5000.0,
+                                                max_windows=5))
+        assert first == windows[:1]
+        assert some == windows[:5]
+
+        # The route only accepts a JSON bool / integer for the early-termination limits
+        payload = {
+            'sat1_tle1': sat1.tle_line1, 'sat1_tle2': sat1.tle_line2,
+            'sat2_tle1': sat2.tle_line1, 'sat2_tle2': sat2.tle_line2,
+            'start_date': start.isoformat(), 'end_date': end.isoformat(),
+            'time_step': 60, 'max_range_km': 5000.0,
+        }
+        client = app.app.test_client()
+        assert client.post('/api/calculate-interlink', json={**payload, 'first_only': True}).get_json()['total_windows'] == 1
+        assert client.post('/api/calculate-interlink', json={**payload, 'first_only': 'false'}).status_code == 400
+        for bad in ({'max_windows': True}, {'max_windows': 2.9}, {'max_windows': '5'},
+                    {'output': 'intervals', 'max_windows': 1}, {'output': 'intervals', 'first_only': True}):
+            assert client.post('/api/calculate-interlink', json={**payload, **bad}).status_code == 400
+
+        # Block boundaries do not change the result
+        chunk_steps = app.WINDOW_CHUNK_STEPS
+        try:
+            app.WINDOW_CHUNK_STEPS = 97
+            chunked = list(calculate_interlink_windows(sat1, sat2, start, end, time_step=60, max_range_km=5000.0))
+        finally:
+            app.WINDOW_CHUNK_STEPS = chunk_steps
+        assert chunked == windows
+        print("✅ Early termination and block propagation match the full result")
+        return True
+    except Exception as e:
+        print(f"❌ Error calculating interlink windows: {e}")
+        return False
+
+
+def test_pure_python_sgp4():
+    """Test propagation and windows with sgp4's pure-Python Satrec / SatrecArray"""
+    print("\n🧪 Testing pure-Python SGP4 fallback...")
+
+    from sgp4 import model
+
+    start, end = START, END
+
+    def run():
+        sat1, sat2 = iss_and_starlink()
+        jd, fr, _ = build_time_grid(start, 10, 60)
+        out = np.empty((2, 10, 3))
+        pooled = propagate_teme([sat1, sat2], jd, fr, buffer='test').copy()
+        shared = propagate_teme([sat1, sat2], jd, fr, out=out)
+        windows = list(calculate_interlink_windows(sat1, sat2, start, end, time_step=60, max_range_km=5000.0))
+        return type(sat1.model), pooled, shared, out, windows
+
+    try:
+        _, ref_pooled, _, _, ref_windows = run()
+
+        accelerated = (app.Satrec, app.SatrecArray)
+        try:
+            app.Satrec, app.SatrecArray = model.Satrec, model.SatrecArray
+            app._build_satrec.cache_clear()
+            satrec_type, pooled, shared, out, windows = run()
+        finally:
+            app.Satrec, app.SatrecArray = accelerated
+            app._build_satrec.cache_clear()
+        print(f"✅ Pure-Python SGP4 produced {len(windows)} windows")
+
+        assert satrec_type is model.Satrec
+        assert np.allclose(pooled, ref_pooled)
+        assert np.shares_memory(shared, out) and np.allclose(shared, ref_pooled)
+        assert [w.ts for w in windows] == [w.ts for w in ref_windows]
+        assert np.allclose([w.d for w in windows], [w.d for w in ref_windows])
+        return True
+    except Exception as e:
+        print(f"❌ Error in pure-Python SGP4 fallback: {e}")
+        return False
+
+
+def test_interlink_intervals():
+    """Test coalescing of per-timestep windows into visibility intervals"""
+    print("\n🧪 Testing interlink interval coalescing...")
+
+    sat1, sat2 = iss_and_starlink()
+    start, end = START, END
+
+    try:
+        windows = list(calculate_interlink_windows(sat1, sat2, start, end, time_step=60, max_range_km=5000.0))
+        intervals = calculate_interlink_intervals(sat1, sat2, start, end, time_step=60, max_range_km=5000.0,
+                                                  refine=False)
+        refined = calculate_interlink_intervals(sat1, sat2, start, end, time_step=60, max_range_km=5000.0)
+        print(f"✅ {len(windows)} windows coalesced into {len(intervals)} intervals")
+
+        assert sum(iv['samples'] for iv in intervals) == len(windows)
+        assert intervals[0]['start'] == windows[0].ts
+        assert intervals[-1]['end'] == windows[-1].ts
+        for iv in intervals:
+            assert iv['min_distance'] <= iv['max_distance'] <= 5000.0
+
+        # Refined edges lie between the last hidden sample and the first/last visible one
+        assert len(refined) == len(intervals)
+        for iv, ref in zip(intervals, refined):
+            grid_start = datetime.fromisoformat(iv['start'])
+            grid_end = datetime.fromisoformat(iv['end'])
+            assert 0.0 <= (grid_start - datetime.fromisoformat(ref['start'])).total_seconds() < 60.0
+            assert 0.0 <= (datetime.fromisoformat(ref['end']) - grid_end).total_seconds() < 60.0
+        return True
+    except Exception as e:
+        print(f"❌ Error coalescing interlink intervals: {e}")
+        return False
+
+
+def test_interlink_many():
+    """Test all-pairs interlink analysis, inline and in the process pool"""
+    print("\n🧪 Testing all-pairs interlink analysis...")
+
+    satellites = [
+        *iss_and_starlink(),
+        Satellite(
+            "STARLINK-1235",
+            "1 44714U 19074B   24001.50000000  .00000000  00000+0  00000+0 0  9999",
+            "2 44714  53.0000 100.0000 0001263 100.0000  90.0000 15.10000000 00000+0",
+        ),
+    ]
+    start, end = START, END
+
+    try:
+        inline = calculate_interlink_many(satellites, start, end, time_step=60, max_range_km=5000.0,
+                                          parallel=False)
+        pooled = calculate_interlink_many(satellites, start, end, time_step=60, max_range_km=5000.0,
+                                          parallel=True)
+        print(f"✅ {len(inline)} pairs analysed: {[p['total_intervals'] for p in inline]} intervals")
+
+        assert len(inline) == 3
+        assert pooled == inline
+
+        # A dead worker breaks the pool: that call finishes inline and the next gets a new pool
+        broken = app._get_pair_pool()
+        assert isinstance(broken.submit(os._exit, 1).exception(), BrokenProcessPool)
+        recovered = calculate_interlink_many(satellites, start, end, time_step=60, max_range_km=5000.0,
+                                             parallel=True)
+        assert recovered == inline
+        assert app._get_pair_pool() is not broken
+        assert calculate_interlink_many(satellites, start, end, time_step=60, max_range_km=5000.0,
+                                        parallel=True) == inline
+        assert (inline[0]['sat1'], inline[0]['sat2']) == ("ISS", "STARLINK-1234")
+        assert inline[0]['intervals'] == calculate_interlink_intervals(
+            satellites[0], satellites[1], start, end, time_step=60, max_range_km=5000.0, refine=False
+        )
+
+        # Route: same pairs over HTTP, and malformed satellite lists are rejected
+        client = app.app.test_client()
+        entries = [{'name': sat.name, 'l1': sat.tle_line1, 'l2': sat.tle_line2} for sat in satellites]
+        span = {'start_date': start.isoformat(), 'end_date': end.isoformat(),
+                'time_step': 60, 'max_range_km': 5000.0}
+        response = client.post('/api/calculate-interlink-many', json={'satellites': entries, **span})
+        assert response.status_code == 200
+        assert response.get_json()['total_pairs'] == 3
+        assert [p['total_intervals'] for p in response.get_json()['pairs']] == \
+            [p['total_intervals'] for p in inline]
+        too_few = client.post('/api/calculate-interlink-many', json={'satellites': entries[:1], **span})
+        missing = client.post('/api/calculate-interlink-many',
+                              json={'satellites': [entries[0], {'l2': entries[1]['l2']}], **span})
+        assert too_few.status_code == 400 and 'at least two' in too_few.get_json()['error']
+        assert missing.status_code == 400 and not missing.get_json()['success']
+        too_many = client.post('/api/calculate-interlink-many',
+                               json={'satellites': entries[:1] * (app.MAX_MANY_SATELLITES + 1), **span})
+        assert too_many.status_code == 400 and 'at most' in too_many.get_json()['error']
+        return True
+    except Exception as e:
+        print(f"❌ Error in all-pairs interlink analysis: {e}")
+        return False
+
+
 def test_imports():
     """Test that all required modules can be imported"""
     print("\n🧪 Testing module imports...")
@@ -117,8 +511,17 @@ def main():
     tests = [
         test_imports,
         test_satellite_class,
+        test_satellite_cache,
+        test_validate_tles,
         test_distance_eci,
         test_earth_obstruction_geometry,
+        test_vectorized_geometry,
+        test_teme_geodetic,
+        test_filter_windows,
+        test_interlink_windows,
+        test_pure_python_sgp4,
+        test_interlink_intervals,
+        test_interlink_many,
     ]
 
     passed = 0